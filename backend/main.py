@@ -8,6 +8,9 @@ from pydantic import BaseModel
 import mimetypes
 import magic
 import tempfile
+import hashlib
+import shutil
+from collections import OrderedDict
 from typing import Dict, Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -135,6 +138,9 @@ async def lifespan(app: FastAPI):
             print(f"Error stopping Ollama: {e}")
         print("Ollama server stopped.")
 
+    # Remove this process's upload directory
+    shutil.rmtree(UPLOAD_DIR, ignore_errors=True)
+
 app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
@@ -398,8 +404,143 @@ class FileUploadResponse(BaseModel):
     file_info: dict
     status: str
 
+# Uploads are stored content-addressed under their SHA-256 digest so that
+# concurrent uploads never collide on a filename and identical documents
+# share a single blob on disk. Refcounts and the lock only cover this
+# process, so each worker process gets its own upload directory.
+UPLOAD_DIR = tempfile.mkdtemp(prefix="office_llm_uploads_")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+ANALYSIS_CACHE_SIZE = 256
+
+upload_refcounts: Dict[str, int] = {}
+upload_lock = asyncio.Lock()
+# Content-derived analysis results keyed by digest, oldest first
+analysis_cache: "OrderedDict[str, dict]" = OrderedDict()
+# Analyses currently running, so concurrent misses for one digest share a single run
+analysis_in_flight: Dict[str, asyncio.Task] = {}
+
+async def store_upload(file: UploadFile) -> tuple:
+    """
+    Stream an upload to disk while hashing it, then move it to its
+    content-addressed path and take a reference on it
+    """
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    hasher = hashlib.sha256()
+
+    buffer = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, prefix="partial_", delete=False)
+    partial_path = buffer.name
+    renamed = False
+
+    try:
+        with buffer:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                buffer.write(chunk)
+
+        digest = hasher.hexdigest()
+        blob_path = os.path.join(UPLOAD_DIR, digest)
+
+        async with upload_lock:
+            # If the same content is already stored the partial copy is a duplicate
+            if not os.path.exists(blob_path):
+                os.replace(partial_path, blob_path)
+                renamed = True
+            upload_refcounts[digest] = upload_refcounts.get(digest, 0) + 1
+    finally:
+        # Also covers cancellation when the client disconnects mid-upload
+        if not renamed and os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    return digest, blob_path
+
+async def release_upload(digest: str):
+    """
+    Drop a reference on a stored upload, deleting the blob once unused
+    """
+    async with upload_lock:
+        remaining = upload_refcounts.get(digest, 0) - 1
+        if remaining > 0:
+            upload_refcounts[digest] = remaining
+            return
+        blob_path = os.path.join(UPLOAD_DIR, digest)
+        try:
+            if os.path.exists(blob_path):
+                os.remove(blob_path)
+                print(f"File deleted: {blob_path}")
+        except OSError as e:
+            # Keep tracking the leftover blob, the next upload of this content reuses it
+            upload_refcounts[digest] = 0
+            print(f"Error deleting file {blob_path}: {e}")
+            return
+        upload_refcounts.pop(digest, None)
+
+def analyze_content(file_path: str) -> tuple:
+    """
+    Get the file type information that depends only on the file content,
+    along with whether type detection succeeded
+    """
+    content_info = {}
+    detected = True
+
+    # Get file type using python-magic (more accurate)
+    try:
+        content_info['magic_type'] = magic.from_file(file_path)
+        content_info['magic_mime'] = magic.from_file(file_path, mime=True)
+    except Exception as e:
+        content_info['magic_type'] = f'Error detecting: {str(e)}'
+        content_info['magic_mime'] = 'Unknown'
+        detected = False
+
+    # Get file size
+    content_info['size_bytes'] = os.path.getsize(file_path)
+    content_info['size_mb'] = round(content_info['size_bytes'] / (1024 * 1024), 2)
+
+    return content_info, detected
+
+async def run_analysis(digest: str, file_path: str) -> tuple:
+    """
+    Analyze a stored upload in a worker thread and cache a successful result.
+    The caller takes a reference on the blob for this task, released here
+    """
+    try:
+        content_info, detected = await asyncio.to_thread(analyze_content, file_path)
+        # Failed detection may be transient, so only cache successful results
+        if detected:
+            analysis_cache[digest] = content_info
+            while len(analysis_cache) > ANALYSIS_CACHE_SIZE:
+                analysis_cache.popitem(last=False)
+        return content_info, detected
+    finally:
+        analysis_in_flight.pop(digest, None)
+        await release_upload(digest)
+
+async def get_cached_analysis(digest: str, file_path: str) -> tuple:
+    """
+    Return the content analysis for a digest, running it only on a cache miss
+    """
+    async with upload_lock:
+        content_info = analysis_cache.get(digest)
+        if content_info is not None:
+            analysis_cache.move_to_end(digest)
+            return content_info, True
+
+        task = analysis_in_flight.get(digest)
+        if task is None:
+            # The task holds its own reference so the blob outlives a cancelled request
+            upload_refcounts[digest] = upload_refcounts.get(digest, 0) + 1
+            task = asyncio.create_task(run_analysis(digest, file_path))
+            analysis_in_flight[digest] = task
+
+    # Shielded so one cancelled request doesn't abort the analysis for the others
+    # Only a real cache hit counts as cached, joining a running analysis still waits for it
+    content_info, _ = await asyncio.shield(task)
+    return content_info, False
+
 # File type detection function
-def get_file_type_info(file_path: str, filename: str) -> dict:
+def get_file_type_info(filename: str, content_info: dict) -> dict:
     """
     Get comprehensive file type information
     """
@@ -413,50 +554,37 @@ def get_file_type_info(file_path: str, filename: str) -> dict:
     mime_type, _ = mimetypes.guess_type(filename)
     file_info['mime_type'] = mime_type or 'Unknown'
     
-    # Get file type using python-magic (more accurate)
-    try:
-        file_info['magic_type'] = magic.from_file(file_path)
-        file_info['magic_mime'] = magic.from_file(file_path, mime=True)
-    except Exception as e:
-        file_info['magic_type'] = f'Error detecting: {str(e)}'
-        file_info['magic_mime'] = 'Unknown'
-    
-    # Get file size
-    file_info['size_bytes'] = os.path.getsize(file_path)
-    file_info['size_mb'] = round(file_info['size_bytes'] / (1024 * 1024), 2)
+    # Content-derived details come from the analysis cache
+    file_info.update(content_info)
     
     return file_info
 
 @app.post("/upload", response_model=FileUploadResponse)
 async def upload_file(file: UploadFile = File(...)):
     """
-    Upload and analyze a file, then delete it
+    Upload and analyze a file, then release it
     """
     try:
         # Check if file is present
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file provided")
         
-        # Create temporary file path
-        temp_dir = tempfile.gettempdir()
-        # Use original filename but make it safe
-        safe_filename = "".join(c for c in file.filename if c.isalnum() or c in (' ', '.', '_', '-')).rstrip()
-        file_path = os.path.join(temp_dir, f"temp_{safe_filename}")
+        # Save the file under its content hash
+        digest, file_path = await store_upload(file)
         
         try:
-            # Save the file temporarily
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Get file type information
-            file_info = get_file_type_info(file_path, file.filename)
+            # Get file type information, reusing earlier results for identical content
+            content_info, cached = await get_cached_analysis(digest, file_path)
+            file_info = get_file_type_info(file.filename, content_info)
+            file_info['sha256'] = digest
+            file_info['cached'] = cached
             
             # Create response message with file details
             response_message = f"""File Analysis Complete! 📁 File Details\\ Name: {file.filename}\\ Extension: {file_info['extension']}\\ Size:{file_info['size_mb']} MB ({file_info['size_bytes']:,} bytes)"""
             
             # Log file information (optional)
             print(f"File processed: {file.filename}")
+            print(f"SHA-256: {digest}{' (cached)' if cached else ''}")
             print(f"Extension: {file_info['extension']}")
             print(f"MIME Type: {file_info['mime_type']}")
             print(f"Magic Type: {file_info['magic_type']}")
@@ -469,16 +597,13 @@ async def upload_file(file: UploadFile = File(...)):
             )
             
         finally:
-            # Always delete the file after processing
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                print(f"File deleted: {file_path}")
+            # Always release the stored file after processing
+            await release_upload(digest)
     
+    except HTTPException:
+        # Keep client errors such as a missing filename as they are instead of a 500
+        raise
     except Exception as e:
-        # Clean up file if it exists and there was an error
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
-        
         print(f"Error processing file: {str(e)}")
         raise HTTPException(
             status_code=500, 